@@ -10,8 +10,25 @@ This script tests:
 """
 
 import subprocess
+import json
 import time
 import sys
+from typing import Optional
+
+try:
+    import requests
+except ImportError:
+    print("Please install required packages:")
+    print("  pip install requests")
+    sys.exit(1)
+
+
+OLLAMA_URL = "http://localhost:11434"
+# Keep the model resident between the warmup and the timed run
+KEEP_ALIVE = "5m"
+
+# One keep-alive connection shared by the warmup and the timed run
+SESSION = requests.Session()
 
 
 def test_ollama():
@@ -31,33 +48,111 @@ def test_ollama():
         return False
 
 
+def generate(
+    model_name: str,
+    prompt: str,
+    options: Optional[dict] = None,
+    timeout: float = 60
+) -> dict:
+    """Stream a completion from the Ollama HTTP API and time the first token"""
+    payload = {
+        "model": model_name,
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": KEEP_ALIVE
+    }
+    if options:
+        payload["options"] = options
+
+    start_time = time.perf_counter()
+    ttft = None
+    parts = []
+    final = {}
+
+    with SESSION.post(
+        f"{OLLAMA_URL}/api/generate",
+        json=payload,
+        stream=True,
+        timeout=timeout
+    ) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if ttft is None and chunk.get("response"):
+                ttft = time.perf_counter() - start_time
+            parts.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                final = chunk
+                break
+
+    final["response"] = "".join(parts)
+    final["ttft"] = ttft
+    final["duration"] = time.perf_counter() - start_time
+    return final
+
+
+def rate(resp: dict, count_key: str, duration_key: str) -> float:
+    """Tokens per second from one of Ollama's count/duration(ns) pairs"""
+    seconds = resp.get(duration_key, 0) / 1e9
+    return resp.get(count_key, 0) / seconds if seconds > 0 else 0
+
+
+def run_cli(model_name: str, prompt: str) -> dict:
+    """Fallback: run the prompt through the ollama CLI"""
+    start_time = time.time()
+    result = subprocess.run(
+        ["ollama", "run", model_name],
+        # Pipe the prompt so large prompts avoid argv limits and quoting
+        input=prompt,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60
+    )
+    elapsed = time.time() - start_time
+
+    # Estimate tokens (CLI gives no counters)
+    tokens = len(result.stdout.split())
+    return {
+        "response": result.stdout,
+        "duration": elapsed,
+        "ttft": None,
+        "tokens_per_sec": tokens / elapsed if elapsed > 0 else 0
+    }
+
+
 def test_model(model_name: str):
     """Test if a specific model works"""
     print(f"\n2. Testing model: {model_name}...")
 
     test_prompt = "def fibonacci(n):\n    # Complete this function"
-
-    start_time = time.time()
+    full_prompt = f"Complete this Python function:\n{test_prompt}"
 
     try:
-        result = subprocess.run(
-            ["ollama", "run", model_name, f"Complete this Python function:\n{test_prompt}"],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=60
-        )
-
-        elapsed = time.time() - start_time
-        output = result.stdout.strip()
+        try:
+            # Load the model first so only generation is timed
+            generate(model_name, "", {"num_predict": 1})
+            resp = generate(model_name, full_prompt)
+            tok_per_sec = rate(resp, "eval_count", "eval_duration")
+            ingest_per_sec = rate(resp, "prompt_eval_count", "prompt_eval_duration")
+        except requests.ConnectionError:
+            print("   ⚠ HTTP API unavailable, falling back to ollama CLI")
+            resp = run_cli(model_name, full_prompt)
+            tok_per_sec = resp["tokens_per_sec"]
+
+        elapsed = resp["duration"] - resp.get("load_duration", 0) / 1e9
+        output = resp["response"].strip()
 
         print(f"   ✓ Model works!")
         print(f"   ✓ Response time: {elapsed:.1f}s")
-
-        # Estimate tokens per second
-        tokens = len(output.split())
-        tok_per_sec = tokens / elapsed if elapsed > 0 else 0
-        print(f"   ✓ Estimated speed: {tok_per_sec:.1f} tok/s")
+        if resp["ttft"] is not None:
+            print(f"   ✓ ttft {resp['ttft'] * 1000:.0f}ms | "
+                  f"ingestion {ingest_per_sec:.1f} tok/s | "
+                  f"generation {tok_per_sec:.1f} tok/s")
+        else:
+            print(f"   ✓ Estimated speed: {tok_per_sec:.1f} tok/s")
 
         print("\n   Generated code:")
         print("   " + "-" * 50)
@@ -67,10 +162,10 @@ def test_model(model_name: str):
 
         return True
 
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, requests.Timeout):
         print("   ✗ Model timed out")
         return False
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, requests.RequestException) as e:
         print(f"   ✗ Model failed: {e}")
         return False
 
@@ -9,22 +9,148 @@ This demonstrates how to:
 4. Get better, more consistent code generation
 """
 
+import io
 import sys
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import functools
 import subprocess
 from pathlib import Path
+from typing import Dict, List, Optional
 
 try:
-    from langchain_community.vectorstores import FAISS
+    import faiss
+    import numpy as np
+    import requests
     from langchain_community.embeddings import HuggingFaceEmbeddings
 except ImportError:
     print("Please install required packages:")
-    print("  pip install langchain langchain-community sentence-transformers faiss-cpu")
+    print("  pip install numpy requests langchain langchain-community "
+          "sentence-transformers faiss-cpu")
     sys.exit(1)
 
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    # Optional: without datasketch only exact repeats hit the cache
+    MinHashLSH = None
+
+
+OLLAMA_URL = "http://localhost:11434"
+
+
+class CachedEmbeddings:
+    """Query embedder backed by an on-disk SQLite cache keyed by text hash"""
+
+    NUM_PERM = 64
+
+    def __init__(
+        self,
+        embeddings,
+        cache_path: Path,
+        fuzzy_threshold: Optional[float] = 0.85
+    ):
+        self.embeddings = embeddings
+        self.conn = sqlite3.connect(str(cache_path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(hash BLOB PRIMARY KEY, vec BLOB)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS queries "
+            "(hash BLOB PRIMARY KEY, text TEXT)"
+        )
+        # Intra-session hits skip SQLite too; misses raise so are never cached
+        self._lookup = functools.lru_cache(maxsize=1024)(self._read)
+
+        # Near-duplicate queries reuse a cached vector via MinHash LSH
+        self.lsh = None
+        if MinHashLSH is not None and fuzzy_threshold:
+            self.lsh = MinHashLSH(threshold=fuzzy_threshold, num_perm=self.NUM_PERM)
+            for key, text in self.conn.execute("SELECT hash, text FROM queries"):
+                self.lsh.insert(key, self._minhash(text))
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    @classmethod
+    def _key(cls, text: str) -> bytes:
+        return hashlib.sha256(cls._normalize(text).encode('utf-8')).digest()
+
+    @classmethod
+    def _minhash(cls, text: str) -> "MinHash":
+        text = cls._normalize(text)
+        mh = MinHash(num_perm=cls.NUM_PERM)
+        for i in range(max(len(text) - 2, 1)):
+            mh.update(text[i:i + 3].encode('utf-8'))
+        return mh
+
+    def _fuzzy_lookup(self, text: str) -> Optional[np.ndarray]:
+        """Return the vector of a similar cached query, if any"""
+        for key in self.lsh.query(self._minhash(text)):
+            try:
+                return self._lookup(key)
+            except KeyError:
+                continue
+        return None
+
+    def _read(self, key: bytes) -> np.ndarray:
+        row = self.conn.execute(
+            "SELECT vec FROM embeddings WHERE hash=?", (key,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return np.frombuffer(row[0], dtype=np.float16).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts, running the model only for cache misses"""
+        keys = [self._key(t) for t in texts]
+        vecs: List[Optional[np.ndarray]] = []
+        misses = []
+
+        for i, key in enumerate(keys):
+            try:
+                vecs.append(self._lookup(key))
+            except KeyError:
+                vec = self._fuzzy_lookup(texts[i]) if self.lsh else None
+                vecs.append(vec)
+                if vec is None:
+                    misses.append(i)
+
+        if misses:
+            new_vecs = self.embeddings.embed_documents([texts[i] for i in misses])
+            rows = []
+            for i, vec in zip(misses, new_vecs):
+                vecs[i] = np.asarray(vec, dtype=np.float32)
+                rows.append((keys[i], vecs[i].astype(np.float16).tobytes()))
+                if self.lsh is not None and keys[i] not in self.lsh:
+                    self.lsh.insert(keys[i], self._minhash(texts[i]))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)", rows
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO queries (hash, text) VALUES (?, ?)",
+                [(keys[i], texts[i]) for i in misses]
+            )
+            self.conn.commit()
+
+        return vecs
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query"""
+        return self.embed_documents([text])[0]
+
 
 class RAGCodeAssistant:
     """Code assistant with RAG-enhanced context"""
 
+    # Cap each snippet at ~400 tokens (~4 characters per token for code)
+    MAX_SNIPPET_CHARS = 400 * 4
+
     def __init__(self, index_path: str = "./rag_system/codebase_index"):
         """Initialize with path to FAISS index"""
         self.index_path = Path(index_path)
@@ -36,36 +162,124 @@ class RAGCodeAssistant:
 
         print("Loading RAG system...")
         self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            encode_kwargs={"batch_size": 32, "normalize_embeddings": True}
         )
 
-        self.vectorstore = FAISS.load_local(
-            str(self.index_path),
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+        self.index = self._load_index()
+        # (docstore, index_to_docstore_id), unpickled on first retrieval
+        self._docstore = None
 
-        self.retriever = self.vectorstore.as_retriever(
-            search_kwargs={"k": 5}
+        # Repeated tasks reuse their embedding instead of re-running MiniLM
+        self.query_embeddings = CachedEmbeddings(
+            self.embeddings, self.index_path.parent / "query_cache.sqlite"
         )
+
+        # HNSW/IVF indexes (see scripts/rebuild_index.py) trade recall for speed
+        index = self.index
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = 64
+        elif hasattr(index, "nprobe"):
+            index.nprobe = 16
+
+        # Search on the GPU when faiss-gpu is installed (HNSW stays on CPU)
+        if hasattr(faiss, "StandardGpuResources") and not hasattr(index, "hnsw"):
+            try:
+                self._gpu_resources = faiss.StandardGpuResources()
+                self.index = faiss.index_cpu_to_gpu(
+                    self._gpu_resources, 0, index
+                )
+                print("✓ FAISS index moved to GPU")
+            except RuntimeError as e:
+                print(f"Warning: Could not move index to GPU: {e}")
+
+        self.top_k = 5
+        # Retrieval results computed ahead of time by prefetch()
+        self._prefetched: Dict[str, List] = {}
+        # Reuse one keep-alive connection to the Ollama server
+        self._session = requests.Session()
         print("✓ RAG system loaded")
 
+    def _load_index(self) -> "faiss.Index":
+        """Load the index memory-mapped so vectors are paged in on demand"""
+        # IO_FLAG_MMAP alone only maps IVF inverted lists; IO_FLAG_MMAP_IFC
+        # (faiss >= 1.8) also maps the Flat/HNSW/SQ vector storage
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        return faiss.read_index(
+            str(self.index_path / "index.faiss"),
+            mmap_flag | faiss.IO_FLAG_READ_ONLY
+        )
+
+    def _get_docstore(self):
+        """Return (docstore, index_to_docstore_id), loading them on first use"""
+        if self._docstore is None:
+            # Same pickle FAISS.load_local reads (written by setup_rag.py)
+            with open(self.index_path / "index.pkl", "rb") as f:
+                self._docstore = pickle.load(f)
+        return self._docstore
+
+    def batch_query(self, queries: List[str], k: Optional[int] = None) -> List[List]:
+        """Retrieve documents for several queries with one encode + search call"""
+        k = k or self.top_k
+        vecs = self.query_embeddings.embed_documents(queries)
+        _, indices = self.index.search(
+            np.vstack(vecs).astype(np.float32), k
+        )
+        docstore, index_to_docstore_id = self._get_docstore()
+
+        results = []
+        for row in indices:
+            docs = []
+            for i in row:
+                if i == -1:
+                    continue
+                doc_id = index_to_docstore_id[i]
+                docs.append(docstore.search(doc_id))
+            results.append(docs)
+        return results
+
+    def prefetch(self, queries: List[str]):
+        """Retrieve context for pending queries in a single batch"""
+        pending = [q for q in queries if q not in self._prefetched]
+        if pending:
+            for query, docs in zip(pending, self.batch_query(pending)):
+                self._prefetched[query] = docs
+
     def get_relevant_context(self, query: str) -> str:
         """Get relevant code context for a query"""
         print(f"\nSearching codebase for: '{query}'")
 
-        docs = self.retriever.get_relevant_documents(query)
+        docs = self._prefetched.pop(query, None)
+        if docs is None:
+            docs = self.batch_query([query])[0]
 
-        context_parts = []
+        # Snippets are written straight into one buffer, no per-doc f-strings
+        context = io.StringIO()
+        seen = set()
         print(f"Found {len(docs)} relevant code snippets:\n")
 
         for i, doc in enumerate(docs, 1):
             source = doc.metadata.get('source', 'unknown')
+
+            # Identical chunks (license headers, boilerplate) only cost prompt tokens
+            digest = hashlib.blake2b(
+                doc.page_content.encode('utf-8'), digest_size=8
+            ).digest()
+            if digest in seen:
+                print(f"{i}. {source} (duplicate, skipped)")
+                continue
+            seen.add(digest)
             print(f"{i}. {source}")
 
-            context_parts.append(f"# From {source}\n{doc.page_content}\n")
+            if context.tell():
+                context.write("\n")
+            context.write("# From ")
+            context.write(source)
+            context.write("\n")
+            context.write(doc.page_content[:self.MAX_SNIPPET_CHARS])
+            context.write("\n")
 
-        return "\n".join(context_parts)
+        return context.getvalue()
 
     def generate_with_context(
         self,
@@ -91,27 +305,68 @@ Please generate code that is consistent with the existing codebase style and pat
         print("Generating code with RAG context...")
         print("=" * 60)
 
-        # Call Ollama
         try:
-            result = subprocess.run(
-                ["ollama", "run", model, prompt],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=120
-            )
-
             print("\nGenerated code:")
             print("-" * 60)
-            print(result.stdout)
+            try:
+                output = self._stream_generate(model, prompt)
+            except requests.ConnectionError:
+                output = self._run_cli(model, prompt)
+                print(output)
             print("-" * 60)
 
-            return result.stdout
+            return output
 
         except Exception as e:
             print(f"Error generating code: {e}")
             return None
 
+    def _stream_generate(self, model: str, prompt: str) -> str:
+        """Print tokens from the Ollama HTTP API as they are generated"""
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        start_time = time.perf_counter()
+        ttft = None
+        parts = []
+
+        with self._session.post(
+            f"{OLLAMA_URL}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=120
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                token = chunk.get("response", "")
+                if token:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start_time
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                    parts.append(token)
+                if chunk.get("done"):
+                    break
+
+        print()
+        if ttft is not None:
+            print(f"(ttft {ttft * 1000:.0f}ms)")
+        return "".join(parts)
+
+    def _run_cli(self, model: str, prompt: str) -> str:
+        """Fallback: run the prompt through the ollama CLI"""
+        result = subprocess.run(
+            ["ollama", "run", model],
+            # Pipe the prompt so large prompts avoid argv limits and quoting
+            input=prompt,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=120
+        )
+        return result.stdout
+
     def interactive_mode(self):
         """Interactive RAG-enhanced coding mode"""
         print("\n" + "=" * 60)
@@ -119,20 +374,35 @@ Please generate code that is consistent with the existing codebase style and pat
         print("=" * 60)
         print("Enter your coding task, and I'll search the codebase")
         print("for relevant examples before generating code.")
+        print("Type 'batch' to enter several tasks (one per line, blank line to")
+        print("finish) and search for them in one batch.")
         print("Type 'quit' to exit.\n")
 
         while True:
             try:
-                task = input("Task: ").strip()
+                line = input("Task: ").strip()
 
-                if task.lower() in ['quit', 'exit', 'q']:
+                if line.lower() in ['quit', 'exit', 'q']:
                     break
 
-                if not task:
+                if line.lower() == 'batch':
+                    tasks = []
+                    while True:
+                        task = input("  ... ").strip()
+                        if not task:
+                            break
+                        tasks.append(task)
+                else:
+                    tasks = [line] if line else []
+
+                if not tasks:
                     continue
 
-                self.generate_with_context(task)
-                print()
+                # Encode every queued task at once before generating
+                self.prefetch(tasks)
+                for task in tasks:
+                    self.generate_with_context(task)
+                    print()
 
             except KeyboardInterrupt:
                 print("\n\nGoodbye!")
@@ -0,0 +1,66 @@
+"""
+FAISS Index Builders
+Shared by setup_rag.py (initial build) and rebuild_index.py (conversion)
+
+Each builder takes the vectors and a FAISS metric and returns a filled index.
+"""
+
+import faiss
+import numpy as np
+
+
+# HNSW graph parameters
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+
+# IVF-PQ parameters (PQ48x8 stores 48 bytes per vector)
+IVF_NLIST = 4096
+PQ_M = 48
+PQ_TRAIN_SAMPLE = 100_000
+
+
+def build_hnsw(xb: "np.ndarray", metric: int) -> "faiss.Index":
+    """Build an HNSW graph index over the given vectors"""
+    index = faiss.IndexHNSWFlat(xb.shape[1], HNSW_M, metric)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.add(xb)
+    return index
+
+
+def build_fp16(xb: "np.ndarray", metric: int) -> "faiss.Index":
+    """Build a flat index storing float16 vectors"""
+    index = faiss.IndexScalarQuantizer(
+        xb.shape[1], faiss.ScalarQuantizer.QT_fp16, metric
+    )
+    index.train(xb)
+    index.add(xb)
+    return index
+
+
+def build_ivfpq(xb: "np.ndarray", metric: int) -> "faiss.Index":
+    """Build an IVF-PQ index, training the quantizers on a sample"""
+    n, d = xb.shape
+
+    # Each IVF list and each 8-bit PQ codebook need enough training points
+    nlist = min(IVF_NLIST, min(n, PQ_TRAIN_SAMPLE) // 39)
+    if nlist < 1 or n < 256:
+        raise ValueError(f"IVF-PQ needs at least 256 vectors, index has {n}")
+    if d % PQ_M != 0:
+        raise ValueError(f"Dimension {d} is not divisible by PQ_M={PQ_M}")
+
+    index = faiss.index_factory(d, f"IVF{nlist},PQ{PQ_M}x8", metric)
+
+    sample = xb
+    if n > PQ_TRAIN_SAMPLE:
+        rng = np.random.default_rng(0)
+        sample = xb[rng.choice(n, PQ_TRAIN_SAMPLE, replace=False)]
+    index.train(sample)
+    index.add(xb)
+    return index
+
+
+BUILDERS = {
+    "hnsw": build_hnsw,
+    "fp16": build_fp16,
+    "ivfpq": build_ivfpq,
+}
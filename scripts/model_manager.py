@@ -8,9 +8,21 @@ import subprocess
 import json
 import time
 import sys
-from typing import Dict, List, Optional
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, Set
 from dataclasses import dataclass
 
+try:
+    import requests
+except ImportError:
+    print("Please install required packages:")
+    print("  pip install requests")
+    sys.exit(1)
+
+
+OLLAMA_URL = "http://localhost:11434"
+
 
 @dataclass
 class ModelInfo:
@@ -55,8 +67,21 @@ class ModelManager:
         ),
     }
 
-    def __init__(self):
+    # Seconds before the installed-model list is re-read from `ollama list`
+    INSTALLED_TTL = 60.0
+
+    # Concurrent `ollama pull` downloads in setup_all_models
+    PULL_WORKERS = 2
+
+    def __init__(self, keep_alive: str = "5m"):
         self.check_ollama()
+        self._installed: Optional[Set[str]] = None
+        self._installed_at = 0.0
+        # How long Ollama keeps a model resident after each request
+        self.keep_alive = keep_alive
+        self._warmed: Set[str] = set()
+        # Reuse one keep-alive connection to the Ollama server for all calls
+        self._session = requests.Session()
 
     def check_ollama(self):
         """Check if Ollama is installed and running"""
@@ -67,7 +92,7 @@ class ModelManager:
             print("Please run ./setup.sh first")
             sys.exit(1)
 
-    def list_models(self) -> List[Dict]:
+    def list_models(self) -> str:
         """List all installed Ollama models"""
         try:
             result = subprocess.run(
@@ -79,64 +104,199 @@ class ModelManager:
             return result.stdout
         except subprocess.CalledProcessError as e:
             print(f"Error listing models: {e}")
-            return []
+            return ""
+
+    @property
+    def installed_set(self) -> Set[str]:
+        """Names of installed models, cached for INSTALLED_TTL seconds"""
+        now = time.monotonic()
+        if self._installed is None or now - self._installed_at > self.INSTALLED_TTL:
+            output = self.list_models()
+            self._installed = {
+                line.split()[0] for line in output.splitlines()[1:] if line.strip()
+            }
+            self._installed_at = now
+        return self._installed
 
     def is_model_installed(self, model_name: str) -> bool:
         """Check if a model is installed"""
-        output = self.list_models()
-        return model_name in output
+        return model_name in self.installed_set
 
-    def pull_model(self, model_name: str):
+    def pull_model(self, model_name: str, quiet: bool = False) -> bool:
         """Pull a model from Ollama registry"""
         print(f"Pulling model: {model_name}")
-        print("This may take a while depending on your internet connection...")
+        if not quiet:
+            print("This may take a while depending on your internet connection...")
         try:
-            subprocess.run(["ollama", "pull", model_name], check=True)
+            # Concurrent pulls would interleave their progress bars
+            subprocess.run(
+                ["ollama", "pull", model_name],
+                check=True,
+                capture_output=quiet,
+                text=True
+            )
+            self._installed = None
             print(f"✓ Successfully pulled {model_name}")
+            return True
         except subprocess.CalledProcessError as e:
             print(f"✗ Error pulling model: {e}")
-
-    def test_model(self, model_name: str, prompt: str = "def fibonacci(n):") -> Dict:
-        """Test a model and measure performance"""
-        print(f"\nTesting {model_name}...")
-        print(f"Prompt: {prompt}")
-        print("-" * 50)
-
+            # Quiet pulls captured ollama's own explanation, surface it
+            if quiet and e.stderr and e.stderr.strip():
+                print(f"  {e.stderr.strip().splitlines()[-1]}")
+            return False
+
+    def _generate(
+        self,
+        model_name: str,
+        prompt: str,
+        options: Optional[Dict] = None,
+        timeout: float = 60
+    ) -> Dict:
+        """Stream a completion from the Ollama HTTP API and time the first token"""
+        payload = {
+            "model": model_name,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        if options:
+            payload["options"] = options
+
+        start_time = time.perf_counter()
+        ttft = None
+        parts = []
+        final = {}
+
+        with self._session.post(
+            f"{OLLAMA_URL}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=timeout
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if ttft is None and chunk.get("response"):
+                    ttft = time.perf_counter() - start_time
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    final = chunk
+                    break
+
+        final["response"] = "".join(parts)
+        final["ttft"] = ttft
+        final["duration"] = time.perf_counter() - start_time
+        return final
+
+    @staticmethod
+    def _rate(resp: Dict, count_key: str, duration_key: str) -> float:
+        """Tokens per second from one of Ollama's count/duration(ns) pairs"""
+        seconds = resp.get(duration_key, 0) / 1e9
+        return resp.get(count_key, 0) / seconds if seconds > 0 else 0
+
+    def _run_cli(self, model_name: str, prompt: str) -> Dict:
+        """Fallback: run the prompt through the ollama CLI"""
         start_time = time.time()
-
+        result = subprocess.run(
+            ["ollama", "run", model_name],
+            # Pipe the prompt so large prompts avoid argv limits and quoting
+            input=prompt,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=60
+        )
+        duration = time.time() - start_time
+
+        # Estimate tokens (rough approximation, CLI gives no counters)
+        output_length = len(result.stdout.split())
+        return {
+            "response": result.stdout,
+            "duration": duration,
+            "ttft": None,
+            "tokens_per_sec": output_length / duration if duration > 0 else 0
+        }
+
+    def warmup_model(self, model_name: str, quiet: bool = False):
+        """Load a model into VRAM so its load time isn't charged to a timed run"""
+        if model_name in self._warmed:
+            return
         try:
-            result = subprocess.run(
-                ["ollama", "run", model_name, f"Complete this code:\n{prompt}"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=60
-            )
-
-            end_time = time.time()
-            duration = end_time - start_time
-
-            print(result.stdout)
+            resp = self._generate(model_name, "", {"num_predict": 1})
+            load_ms = resp.get("load_duration", 0) / 1e6
+            if not quiet:
+                print(f"Warmed up {model_name} (load {load_ms:.0f}ms, "
+                      f"keep_alive {self.keep_alive})")
+            self._warmed.add(model_name)
+        except requests.RequestException as e:
+            print(f"Warning: could not warm up {model_name}: {e}")
+
+    def test_model(
+        self,
+        model_name: str,
+        prompt: str = "def fibonacci(n):",
+        show_output: bool = True,
+        quiet: bool = False
+    ) -> Dict:
+        """Test a model and measure performance"""
+        if not quiet:
+            print(f"\nTesting {model_name}...")
+            print(f"Prompt: {prompt}")
             print("-" * 50)
-            print(f"Time taken: {duration:.2f} seconds")
 
-            # Estimate tokens (rough approximation)
-            output_length = len(result.stdout.split())
-            tok_per_sec = output_length / duration if duration > 0 else 0
-            print(f"Estimated speed: {tok_per_sec:.1f} tok/s")
+        full_prompt = f"Complete this code:\n{prompt}"
+
+        try:
+            try:
+                self.warmup_model(model_name, quiet)
+                resp = self._generate(model_name, full_prompt)
+                tok_per_sec = self._rate(resp, "eval_count", "eval_duration")
+                ingest_per_sec = self._rate(
+                    resp, "prompt_eval_count", "prompt_eval_duration"
+                )
+            except requests.ConnectionError as e:
+                if not quiet:
+                    print(f"HTTP API unavailable ({e}), falling back to ollama CLI")
+                resp = self._run_cli(model_name, full_prompt)
+                tok_per_sec = resp["tokens_per_sec"]
+                ingest_per_sec = None
+
+            # Any reload that still happened isn't generation time
+            duration = resp["duration"] - resp.get("load_duration", 0) / 1e9
+            ttft = resp["ttft"]
+
+            if not quiet:
+                if show_output:
+                    print(resp["response"])
+                    print("-" * 50)
+                print(f"Time taken: {duration:.2f} seconds")
+                if ttft is not None:
+                    print(f"ttft {ttft * 1000:.0f}ms | "
+                          f"ingestion {ingest_per_sec:.1f} tok/s | "
+                          f"generation {tok_per_sec:.1f} tok/s")
+                else:
+                    print(f"Estimated speed: {tok_per_sec:.1f} tok/s")
 
             return {
                 "success": True,
                 "duration": duration,
-                "output": result.stdout,
-                "tokens_per_sec": tok_per_sec
+                "output": resp["response"],
+                "ttft": ttft,
+                "ingestion_tokens_per_sec": ingest_per_sec,
+                "tokens_per_sec": tok_per_sec,
+                "load_duration_ms": resp.get("load_duration", 0) / 1e6,
+                "eval_count": resp.get("eval_count")
             }
 
-        except subprocess.TimeoutExpired:
-            print("✗ Test timed out (>60s)")
+        except (subprocess.TimeoutExpired, requests.Timeout):
+            if not quiet:
+                print("✗ Test timed out (>60s)")
             return {"success": False, "error": "timeout"}
-        except subprocess.CalledProcessError as e:
-            print(f"✗ Error running model: {e}")
+        except (subprocess.CalledProcessError, requests.RequestException) as e:
+            if not quiet:
+                print(f"✗ Error running model: {e}")
             return {"success": False, "error": str(e)}
 
     def show_model_info(self):
@@ -158,15 +318,65 @@ class ModelManager:
         print("Setting up all recommended models...")
         print("This will download several GB of data.\n")
 
+        # Collect approvals first, then download in parallel
+        to_pull = []
         for key, model in self.MODELS.items():
             if not self.is_model_installed(model.name):
                 response = input(f"Pull {key} model ({model.name})? [Y/n]: ")
                 if response.lower() != 'n':
-                    self.pull_model(model.name)
+                    to_pull.append((key, model))
             else:
                 print(f"✓ {key} model already installed")
 
-    def benchmark_all(self):
+        if not to_pull:
+            return
+
+        # Pulls are network-bound; two at a time overlaps downloads without
+        # hammering the registry
+        print(f"\nDownloading {len(to_pull)} model(s)...")
+        with ThreadPoolExecutor(max_workers=self.PULL_WORKERS) as executor:
+            futures = {
+                executor.submit(self.pull_model, model.name, True): key
+                for key, model in to_pull
+            }
+            for future in as_completed(futures):
+                if not future.result():
+                    print(f"✗ {futures[future]} model failed to download")
+
+    def benchmark_model(self, model: ModelInfo, prompt: str, runs: int) -> Dict:
+        """Run one model several times and summarise the per-run records"""
+        records = []
+        for run in range(runs):
+            result = self.test_model(model.name, prompt, quiet=True)
+            if not result.get("success"):
+                return result
+
+            ttft = result["ttft"]
+            records.append({
+                "run": run + 1,
+                "ttft_ms": ttft * 1000 if ttft is not None else None,
+                "ingestion_tok_s": result["ingestion_tokens_per_sec"],
+                "generation_tok_s": result["tokens_per_sec"],
+                "load_duration_ms": result["load_duration_ms"],
+                "eval_count": result["eval_count"],
+                "duration": result["duration"]
+            })
+
+        # The first run still pays one-off costs, so leave it out of the stats
+        warm = records[1:] or records
+        generation = [r["generation_tok_s"] for r in warm]
+        ttfts = [r["ttft_ms"] for r in warm if r["ttft_ms"] is not None]
+
+        return {
+            "success": True,
+            "records": records,
+            "generation_mean": statistics.mean(generation),
+            "generation_std": statistics.stdev(generation) if len(generation) > 1 else 0.0,
+            "ttft_mean_ms": statistics.mean(ttfts) if ttfts else None,
+            "duration": statistics.mean(r["duration"] for r in warm)
+        }
+
+    def benchmark_all(self, runs: int = 5):
         """Run benchmarks on all installed models"""
         print("\n" + "=" * 60)
         print("Benchmarking Installed Models")
@@ -175,44 +385,79 @@ class ModelManager:
         test_prompt = "def quicksort(arr):"
         results = {}
 
+        to_run = []
         for key, model in self.MODELS.items():
             if self.is_model_installed(model.name):
-                result = self.test_model(model.name, test_prompt)
-                results[key] = result
+                to_run.append((key, model))
             else:
                 print(f"\nSkipping {key} - not installed")
 
+        # A single worker keeps Ollama serving one model at a time while the
+        # main thread writes and prints each result during the next model's runs
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futures = {
+                executor.submit(self.benchmark_model, model, test_prompt, runs): key
+                for key, model in to_run
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                result = results[key] = future.result()
+                if not result.get("success"):
+                    print(f"\n✗ {key}: {result.get('error', 'unknown')}")
+                    continue
+
+                result["output_file"] = f"bench_{key}.json"
+                with open(result["output_file"], 'w') as f:
+                    json.dump(result["records"], f, indent=2)
+
+                first = result["records"][0]
+                print(f"\n✓ {key}: {self.MODELS[key].name} ({len(result['records'])} runs)")
+                print(f"  First run: {first['duration']:.2f}s, "
+                      f"{first['generation_tok_s']:.1f} tok/s")
+
         print("\n" + "=" * 60)
-        print("Benchmark Summary")
+        print(f"Benchmark Summary ({runs} runs, first run excluded)")
         print("=" * 60 + "\n")
 
         for key, result in results.items():
             if result.get("success"):
-                print(f"{key.upper():12} - {result['tokens_per_sec']:.1f} tok/s "
-                      f"({result['duration']:.1f}s)")
+                ttft = result["ttft_mean_ms"]
+                ttft_str = f" | ttft {ttft:.0f}ms" if ttft is not None else ""
+                print(f"{key.upper():12} - generation {result['generation_mean']:.2f} tok/s "
+                      f"(± {result['generation_std']:.2f}){ttft_str} "
+                      f"-> {result['output_file']}")
             else:
                 print(f"{key.upper():12} - Failed: {result.get('error', 'unknown')}")
 
 
 def main():
-    manager = ModelManager()
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(
+        a[2:].split("=", 1) for a in sys.argv[1:]
+        if a.startswith("--") and "=" in a
+    )
+
+    manager = ModelManager(keep_alive=flags.get("keep-alive", "5m"))
 
-    if len(sys.argv) < 2:
+    if not args:
         print("Model Manager for Local LLM")
-        print("\nUsage: python model_manager.py <command>")
+        print("\nUsage: python model_manager.py <command> [--keep-alive=5m]")
         print("\nCommands:")
         print("  list       - List installed models")
         print("  info       - Show model information")
         print("  setup      - Pull all recommended models")
         print("  test       - Test a specific model")
         print("  benchmark  - Benchmark all installed models")
+        print("\nOptions:")
+        print("  --keep-alive=DURATION  How long Ollama keeps models loaded (default 5m)")
+        print("  --runs=N               Runs per model for benchmark (default 5)")
         print("\nExamples:")
         print("  python model_manager.py info")
         print("  python model_manager.py test primary")
-        print("  python model_manager.py benchmark")
+        print("  python model_manager.py benchmark --keep-alive=30m")
         sys.exit(0)
 
-    command = sys.argv[1]
+    command = args[0]
 
     if command == "list":
         print(manager.list_models())
@@ -224,12 +469,12 @@ def main():
         manager.setup_all_models()
 
     elif command == "test":
-        if len(sys.argv) < 3:
+        if len(args) < 2:
             print("Usage: python model_manager.py test <model_key>")
             print("Available keys: primary, fast, extended, complex")
             sys.exit(1)
 
-        model_key = sys.argv[2]
+        model_key = args[1]
         if model_key not in manager.MODELS:
             print(f"Unknown model key: {model_key}")
             sys.exit(1)
@@ -243,7 +488,12 @@ def main():
         manager.test_model(model.name)
 
     elif command == "benchmark":
-        manager.benchmark_all()
+        runs = flags.get("runs", "5")
+        if not runs.isdigit() or int(runs) < 1:
+            print("Usage: python model_manager.py benchmark [--runs=N]")
+            print("--runs must be a whole number >= 1")
+            sys.exit(1)
+        manager.benchmark_all(runs=int(runs))
 
     else:
         print(f"Unknown command: {command}")
@@ -8,13 +8,36 @@ optimal performance.
 """
 
 import subprocess
+import functools
+import io
 import time
 import sys
 import json
+from bisect import bisect_left
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, Optional
 from dataclasses import dataclass, asdict
 
+try:
+    import pynvml
+except ImportError:
+    # Fall back to polling nvidia-smi (pip install nvidia-ml-py to avoid forks)
+    pynvml = None
+
+try:
+    import psutil
+except ImportError:
+    print("Please install required packages:")
+    print("  pip install psutil")
+    sys.exit(1)
+
+
+# ANSI sequences for in-place redraw in watch mode
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
 
 @dataclass
 class GPUMetrics:
@@ -35,6 +58,21 @@ class SystemMetrics:
     ram_percent: float
 
 
+@dataclass
+class SummaryStats:
+    """Running totals so the summary doesn't need every sample"""
+    samples: int = 0
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    vram_sum: float = 0.0
+    vram_max: float = float("-inf")
+    vram_min: float = float("inf")
+    util_sum: float = 0.0
+    util_max: float = float("-inf")
+    warning_count: int = 0
+    critical_count: int = 0
+
+
 class PerformanceMonitor:
     """Monitor system and GPU performance"""
 
@@ -42,12 +80,53 @@ class PerformanceMonitor:
     VRAM_WARNING_MB = 10500  # 10.5 GB
     VRAM_CRITICAL_MB = 11500  # 11.5 GB
 
+    # Adaptive polling: fast while VRAM moves, back off while stable
+    POLL_MIN_INTERVAL = 0.5
+    POLL_MAX_INTERVAL = 30.0
+    POLL_BACKOFF = 1.5
+    VRAM_CHANGE_MB = 50
+
+    # Context estimate: ~3.2GB per 16K context for 7B
+    CONTEXT_K_PER_MB = 16 / 3.2
+
+    # Model advice by free VRAM: entry i applies above RECOMMENDATION_THRESHOLDS[i - 1]
+    RECOMMENDATION_THRESHOLDS = [4000, 6000, 8000]
+    MODEL_RECOMMENDATIONS = [
+        ["  ⚠ VRAM heavily utilized"],
+        ["  ⚠ Consider 7B Q4 or smaller models"],
+        ["  ✓ Can run 7B Q6 + 32K context",
+         "  ⚠ 14B models may be tight"],
+        ["  ✓ Can run 7B Q8 + 32K context",
+         "  ✓ Can run 14B Q4 + 16K context with hybrid"],
+    ]
+
+    # Samples kept in metrics_history (~5.5 hours at 2s)
+    HISTORY_SIZE = 10_000
+
+    # Seconds sampled for the first CPU reading (no earlier sample to diff against)
+    CPU_SAMPLE_INTERVAL = 0.1
+
     def __init__(self):
         self.check_nvidia()
-        self.metrics_history: List[GPUMetrics] = []
+        self.metrics_history: Deque[GPUMetrics] = deque(maxlen=self.HISTORY_SIZE)
+        self.stats = SummaryStats()
+        # The first CPU reading blocks briefly; later ones are deltas
+        self._cpu_sampled = False
 
     def check_nvidia(self):
-        """Check if nvidia-smi is available"""
+        """Check if NVML or nvidia-smi is available"""
+        self._handle = None
+
+        if pynvml is not None:
+            try:
+                pynvml.nvmlInit()
+                self._handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+                return
+            except pynvml.NVMLError as e:
+                print(f"Error: Could not initialize NVML: {e}")
+                print("Please ensure NVIDIA drivers are installed")
+                sys.exit(1)
+
         try:
             subprocess.run(
                 ["nvidia-smi"],
@@ -59,25 +138,40 @@ class PerformanceMonitor:
             print("Please ensure NVIDIA drivers are installed")
             sys.exit(1)
 
+    def _read_nvml(self):
+        """Read VRAM (MB), utilization and temperature via NVML"""
+        mem = pynvml.nvmlDeviceGetMemoryInfo(self._handle)
+        util = pynvml.nvmlDeviceGetUtilizationRates(self._handle)
+        temp = pynvml.nvmlDeviceGetTemperature(
+            self._handle, pynvml.NVML_TEMPERATURE_GPU
+        )
+        mb = 1024 * 1024
+        return mem.used / mb, mem.total / mb, float(util.gpu), float(temp)
+
+    def _read_nvidia_smi(self):
+        """Read VRAM (MB), utilization and temperature via nvidia-smi"""
+        result = subprocess.run(
+            [
+                "nvidia-smi",
+                "--query-gpu=memory.used,memory.total,utilization.gpu,temperature.gpu",
+                "--format=csv,noheader,nounits"
+            ],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        values = result.stdout.strip().split(',')
+        temp = float(values[3]) if len(values) > 3 else None
+        return float(values[0]), float(values[1]), float(values[2]), temp
+
     def get_gpu_metrics(self) -> Optional[GPUMetrics]:
         """Get current GPU metrics"""
         try:
-            result = subprocess.run(
-                [
-                    "nvidia-smi",
-                    "--query-gpu=memory.used,memory.total,utilization.gpu,temperature.gpu",
-                    "--format=csv,noheader,nounits"
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            values = result.stdout.strip().split(',')
-            vram_used = float(values[0])
-            vram_total = float(values[1])
-            gpu_util = float(values[2])
-            temp = float(values[3]) if len(values) > 3 else None
+            if self._handle is not None:
+                vram_used, vram_total, gpu_util, temp = self._read_nvml()
+            else:
+                vram_used, vram_total, gpu_util, temp = self._read_nvidia_smi()
 
             return GPUMetrics(
                 timestamp=datetime.now().isoformat(),
@@ -95,28 +189,17 @@ class PerformanceMonitor:
     def get_system_metrics(self) -> Optional[SystemMetrics]:
         """Get current system metrics"""
         try:
-            # Get CPU usage
-            with open('/proc/stat', 'r') as f:
-                cpu_line = f.readline()
-                cpu_times = [int(x) for x in cpu_line.split()[1:]]
-                cpu_total = sum(cpu_times)
-                cpu_idle = cpu_times[3]
-                cpu_percent = 100 * (1 - cpu_idle / cpu_total)
-
-            # Get memory usage
-            with open('/proc/meminfo', 'r') as f:
-                meminfo = {}
-                for line in f:
-                    parts = line.split(':')
-                    if len(parts) == 2:
-                        key = parts[0].strip()
-                        value = int(parts[1].strip().split()[0])  # KB
-                        meminfo[key] = value
-
-            mem_total_gb = meminfo['MemTotal'] / (1024 * 1024)
-            mem_available_gb = meminfo['MemAvailable'] / (1024 * 1024)
-            mem_used_gb = mem_total_gb - mem_available_gb
-            mem_percent = (mem_used_gb / mem_total_gb) * 100
+            # CPU usage since the previous call (delta-based); with no previous
+            # call a non-blocking reading would be ~0.0, so sample briefly
+            interval = None if self._cpu_sampled else self.CPU_SAMPLE_INTERVAL
+            cpu_percent = psutil.cpu_percent(interval=interval)
+            self._cpu_sampled = True
+
+            vm = psutil.virtual_memory()
+            gb = 1024 ** 3
+            mem_total_gb = vm.total / gb
+            mem_used_gb = (vm.total - vm.available) / gb
+            mem_percent = vm.percent
 
             return SystemMetrics(
                 timestamp=datetime.now().isoformat(),
@@ -139,8 +222,13 @@ class PerformanceMonitor:
         else:
             return "OK"
 
-    def print_metrics(self, gpu: GPUMetrics, system: Optional[SystemMetrics] = None):
-        """Print metrics in a nice format"""
+    def print_metrics(
+        self,
+        gpu: GPUMetrics,
+        system: Optional[SystemMetrics] = None,
+        redraw: bool = False
+    ):
+        """Print metrics in a nice format (redraw=True updates the screen in place)"""
         status = self.check_vram_status(gpu)
 
         # Color codes
@@ -158,102 +246,149 @@ class PerformanceMonitor:
         else:
             color = GREEN
 
-        print("\n" + "=" * 60)
-        print(f"GPU Metrics - {datetime.now().strftime('%H:%M:%S')}")
-        print("=" * 60)
+        # Build the whole report in memory and write it with a single call
+        buf = io.StringIO()
+        out = functools.partial(print, file=buf)
 
-        print(f"{color}VRAM Status: {status}{RESET}")
-        print(f"VRAM Used:   {gpu.vram_used_mb:.0f} MB / {gpu.vram_total_mb:.0f} MB "
-              f"({gpu.vram_percent:.1f}%)")
-        print(f"GPU Util:    {gpu.gpu_utilization:.0f}%")
+        out("\n" + "=" * 60)
+        out(f"GPU Metrics - {datetime.now().strftime('%H:%M:%S')}")
+        out("=" * 60)
+
+        out(f"{color}VRAM Status: {status}{RESET}")
+        out(f"VRAM Used:   {gpu.vram_used_mb:.0f} MB / {gpu.vram_total_mb:.0f} MB "
+            f"({gpu.vram_percent:.1f}%)")
+        out(f"GPU Util:    {gpu.gpu_utilization:.0f}%")
 
         if gpu.temperature:
-            print(f"Temperature: {gpu.temperature:.0f}°C")
+            out(f"Temperature: {gpu.temperature:.0f}°C")
 
         # Calculate remaining VRAM
         remaining = gpu.vram_total_mb - gpu.vram_used_mb
-        print(f"Remaining:   {remaining:.0f} MB")
+        out(f"Remaining:   {remaining:.0f} MB")
 
         # Estimate context capacity
-        context_capacity_16k = remaining / 3.2  # ~3.2GB per 16K context for 7B
-        print(f"Estimated additional context capacity: ~{context_capacity_16k * 16:.0f}K tokens")
+        out(f"Estimated additional context capacity: "
+            f"~{remaining * self.CONTEXT_K_PER_MB:.0f}K tokens")
 
         if system:
-            print("\n" + "-" * 60)
-            print("System Metrics")
-            print("-" * 60)
-            print(f"CPU Usage:   {system.cpu_percent:.1f}%")
-            print(f"RAM Used:    {system.ram_used_gb:.1f} GB / {system.ram_total_gb:.1f} GB "
-                  f"({system.ram_percent:.1f}%)")
+            out("\n" + "-" * 60)
+            out("System Metrics")
+            out("-" * 60)
+            out(f"CPU Usage:   {system.cpu_percent:.1f}%")
+            out(f"RAM Used:    {system.ram_used_gb:.1f} GB / {system.ram_total_gb:.1f} GB "
+                f"({system.ram_percent:.1f}%)")
 
         # Warnings
         if status == "CRITICAL":
-            print(f"\n{RED}⚠ CRITICAL: VRAM usage is dangerously high!{RESET}")
-            print("Risk of overflow to system RAM (30-50x slowdown)")
-            print("Actions:")
-            print("  - Reduce context window size")
-            print("  - Switch to smaller model or lower quantization")
-            print("  - Enable KV cache quantization")
+            out(f"\n{RED}⚠ CRITICAL: VRAM usage is dangerously high!{RESET}")
+            out("Risk of overflow to system RAM (30-50x slowdown)")
+            out("Actions:")
+            out("  - Reduce context window size")
+            out("  - Switch to smaller model or lower quantization")
+            out("  - Enable KV cache quantization")
 
         elif status == "WARNING":
-            print(f"\n{YELLOW}⚠ WARNING: VRAM usage is high{RESET}")
-            print("Consider:")
-            print("  - Monitoring closely during generation")
-            print("  - Reducing context if possible")
+            out(f"\n{YELLOW}⚠ WARNING: VRAM usage is high{RESET}")
+            out("Consider:")
+            out("  - Monitoring closely during generation")
+            out("  - Reducing context if possible")
+
+        if redraw:
+            sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
     def monitor_continuous(self, interval: float = 2.0):
         """Continuously monitor and display metrics"""
         print("Starting continuous monitoring...")
-        print(f"Update interval: {interval}s")
+        print(f"Update interval: {self.POLL_MIN_INTERVAL}-{self.POLL_MAX_INTERVAL:.0f}s "
+              f"(adaptive, starting at {interval}s)")
         print("Press Ctrl+C to stop")
 
+        last_vram = None
+        sys.stdout.write(HIDE_CURSOR)
+
         try:
             while True:
                 gpu = self.get_gpu_metrics()
                 system = self.get_system_metrics()
 
                 if gpu:
-                    self.metrics_history.append(gpu)
-                    self.print_metrics(gpu, system)
+                    self.record_metrics(gpu)
+                    self.print_metrics(gpu, system, redraw=True)
+
+                    stable = (
+                        last_vram is not None
+                        and abs(gpu.vram_used_mb - last_vram) < self.VRAM_CHANGE_MB
+                        and self.check_vram_status(gpu) == "OK"
+                    )
+                    if stable:
+                        interval = min(interval * self.POLL_BACKOFF,
+                                       self.POLL_MAX_INTERVAL)
+                    else:
+                        interval = self.POLL_MIN_INTERVAL
+                    last_vram = gpu.vram_used_mb
 
                 time.sleep(interval)
 
         except KeyboardInterrupt:
             print("\n\nMonitoring stopped")
             self.print_summary()
+        finally:
+            sys.stdout.write(SHOW_CURSOR)
+            sys.stdout.flush()
+
+    def record_metrics(self, gpu: GPUMetrics):
+        """Store a sample and fold it into the running summary"""
+        self.metrics_history.append(gpu)
+
+        stats = self.stats
+        stats.samples += 1
+        if stats.first_timestamp is None:
+            stats.first_timestamp = gpu.timestamp
+        stats.last_timestamp = gpu.timestamp
+        stats.vram_sum += gpu.vram_used_mb
+        stats.vram_max = max(stats.vram_max, gpu.vram_used_mb)
+        stats.vram_min = min(stats.vram_min, gpu.vram_used_mb)
+        stats.util_sum += gpu.gpu_utilization
+        stats.util_max = max(stats.util_max, gpu.gpu_utilization)
+        if gpu.vram_used_mb >= self.VRAM_WARNING_MB:
+            stats.warning_count += 1
+        if gpu.vram_used_mb >= self.VRAM_CRITICAL_MB:
+            stats.critical_count += 1
 
     def print_summary(self):
         """Print summary statistics"""
-        if not self.metrics_history:
+        stats = self.stats
+        if not stats.samples:
             return
 
         print("\n" + "=" * 60)
         print("Monitoring Summary")
         print("=" * 60)
 
-        vram_values = [m.vram_used_mb for m in self.metrics_history]
-        gpu_util_values = [m.gpu_utilization for m in self.metrics_history]
-
-        print(f"Duration:     {len(self.metrics_history) * 2:.0f} seconds")
-        print(f"Samples:      {len(self.metrics_history)}")
+        # Samples are unevenly spaced with adaptive polling, so use timestamps
+        duration = (
+            datetime.fromisoformat(stats.last_timestamp)
+            - datetime.fromisoformat(stats.first_timestamp)
+        ).total_seconds()
+        print(f"Duration:     {duration:.0f} seconds")
+        print(f"Samples:      {stats.samples}")
         print()
         print("VRAM Usage:")
-        print(f"  Average:    {sum(vram_values) / len(vram_values):.0f} MB")
-        print(f"  Peak:       {max(vram_values):.0f} MB")
-        print(f"  Minimum:    {min(vram_values):.0f} MB")
+        print(f"  Average:    {stats.vram_sum / stats.samples:.0f} MB")
+        print(f"  Peak:       {stats.vram_max:.0f} MB")
+        print(f"  Minimum:    {stats.vram_min:.0f} MB")
         print()
         print("GPU Utilization:")
-        print(f"  Average:    {sum(gpu_util_values) / len(gpu_util_values):.1f}%")
-        print(f"  Peak:       {max(gpu_util_values):.0f}%")
+        print(f"  Average:    {stats.util_sum / stats.samples:.1f}%")
+        print(f"  Peak:       {stats.util_max:.0f}%")
 
         # Check if we hit critical levels
-        critical_count = sum(1 for v in vram_values if v >= self.VRAM_CRITICAL_MB)
-        warning_count = sum(1 for v in vram_values if v >= self.VRAM_WARNING_MB)
-
-        if critical_count > 0:
-            print(f"\n⚠ Hit critical VRAM levels {critical_count} times!")
-        elif warning_count > 0:
-            print(f"\n⚠ Hit warning VRAM levels {warning_count} times")
+        if stats.critical_count > 0:
+            print(f"\n⚠ Hit critical VRAM levels {stats.critical_count} times!")
+        elif stats.warning_count > 0:
+            print(f"\n⚠ Hit warning VRAM levels {stats.warning_count} times")
 
     def save_metrics(self, filename: str = "metrics.json"):
         """Save metrics history to file"""
@@ -276,21 +411,13 @@ class PerformanceMonitor:
 
         # Model recommendations
         print("\nModel Selection:")
-        if vram_free > 8000:
-            print("  ✓ Can run 7B Q8 + 32K context")
-            print("  ✓ Can run 14B Q4 + 16K context with hybrid")
-        elif vram_free > 6000:
-            print("  ✓ Can run 7B Q6 + 32K context")
-            print("  ⚠ 14B models may be tight")
-        elif vram_free > 4000:
-            print("  ⚠ Consider 7B Q4 or smaller models")
-        else:
-            print("  ⚠ VRAM heavily utilized")
+        bucket = bisect_left(self.RECOMMENDATION_THRESHOLDS, vram_free)
+        for line in self.MODEL_RECOMMENDATIONS[bucket]:
+            print(line)
 
         # Context recommendations
         print("\nContext Window:")
-        max_context_16k_units = vram_free / 3.2
-        print(f"  Safe context: ~{max_context_16k_units * 16:.0f}K tokens")
+        print(f"  Safe context: ~{vram_free * self.CONTEXT_K_PER_MB:.0f}K tokens")
 
         # Optimization suggestions
         print("\nOptimizations to consider:")
@@ -310,7 +437,7 @@ def main():
         print("\nUsage: python monitor.py <command>")
         print("\nCommands:")
         print("  status  - Show current status")
-        print("  watch   - Continuously monitor (update every 2s)")
+        print("  watch   - Continuously monitor (adaptive 0.5-30s updates)")
         print("  info    - Show optimization recommendations")
         print("\nExamples:")
         print("  python monitor.py status")
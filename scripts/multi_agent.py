@@ -12,14 +12,43 @@ Research shows this approach yields 40-60% bug reduction and 130% improvement
 over direct generation.
 """
 
-import subprocess
 import json
+import os
+import subprocess
 import sys
+import threading
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    import requests
+except ImportError:
+    print("Please install required packages:")
+    print("  pip install requests")
+    sys.exit(1)
+
+try:
+    import orjson
+except ImportError:
+    # Optional: results are written with the stdlib json module instead
+    orjson = None
+
+
+OLLAMA_URL = "http://localhost:11434"
+
+
+def save_results(results: Dict, output_file: str):
+    """Write workflow results as indented JSON"""
+    if orjson is not None:
+        Path(output_file).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
 
 class AgentRole(Enum):
     PLANNING = "planning"
@@ -36,6 +65,81 @@ class ModelConfig:
     description: str
 
 
+class SemanticCache:
+    """Cache of model outputs keyed by the embedding of the task text
+
+    A lookup hits when a stored task has cosine similarity >= threshold
+    with the new one and was answered by the same model. Entries are
+    persisted as <name>.faiss plus a <name>.json sidecar.
+    """
+
+    def __init__(self, embedder, cache_dir: Path, name: str, threshold: float = 0.92):
+        import faiss
+        import numpy as np
+
+        self._faiss = faiss
+        self._np = np
+        self.embedder = embedder
+        self.threshold = threshold
+        self.index_path = cache_dir / f"{name}.faiss"
+        self.entries_path = cache_dir / f"{name}.json"
+
+        self.index = None
+        self.entries: List[Dict] = []
+        if self.index_path.exists() and self.entries_path.exists():
+            self.index = faiss.read_index(str(self.index_path))
+            with open(self.entries_path) as f:
+                self.entries = json.load(f)
+
+            # A run interrupted between the two writes leaves them out of step;
+            # keep only the rows both files have so ids map to the right entry
+            n = min(self.index.ntotal, len(self.entries))
+            if self.index.ntotal > n:
+                self.index.remove_ids(faiss.IDSelectorRange(n, self.index.ntotal))
+            del self.entries[n:]
+
+    def _embed(self, text: str):
+        vec = self._np.asarray([self.embedder.embed_query(text)], dtype=self._np.float32)
+        self._faiss.normalize_L2(vec)
+        return vec
+
+    def lookup(self, text: str, model: str) -> Optional[Tuple[str, float]]:
+        """Return (cached output, similarity) for a similar task, if any"""
+        if self.index is None or self.index.ntotal == 0:
+            return None
+
+        scores, ids = self.index.search(self._embed(text), 1)
+        score, idx = float(scores[0][0]), int(ids[0][0])
+        if idx < 0 or score < self.threshold:
+            return None
+
+        if idx >= len(self.entries):
+            return None
+        entry = self.entries[idx]
+        if entry["model"] != model:
+            return None
+        return entry["output"], score
+
+    def store(self, text: str, model: str, output: str):
+        """Add a task/output pair and persist the cache"""
+        vec = self._embed(text)
+        if self.index is None:
+            self.index = self._faiss.IndexFlatIP(vec.shape[1])
+        self.index.add(vec)
+        self.entries.append({"task": text, "model": model, "output": output})
+
+        # Each file is replaced atomically, so neither is ever half-written
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_index = self.index_path.with_suffix(".faiss.tmp")
+        self._faiss.write_index(self.index, str(tmp_index))
+        os.replace(tmp_index, self.index_path)
+
+        tmp_entries = self.entries_path.with_suffix(".json.tmp")
+        with open(tmp_entries, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_entries, self.entries_path)
+
+
 class MultiAgentOrchestrator:
     """Orchestrates multiple models for improved code quality"""
 
@@ -60,53 +164,244 @@ class MultiAgentOrchestrator:
         ),
     }
 
-    def __init__(self, verbose: bool = True):
+    # Every iterative-refinement pass runs on one model, so no pass waits on
+    # a reload; the passes differ by prompt and temperature instead
+    ITERATIVE_MODEL = "qwen2.5-coder:7b-instruct-q6_K"
+
+    # Allowance per model for KV cache and compute buffers on top of weights
+    WARM_OVERHEAD_MB = 1024
+
+    # How long Ollama keeps each model resident between calls
+    KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+    def __init__(
+        self,
+        verbose: bool = True,
+        use_cache: bool = True,
+        cache_dir: str = "./agent_cache",
+        warm_up: bool = False
+    ):
         self.verbose = verbose
+        # Bound once, so quiet runs pay no per-call flag check
+        self.log = print if verbose else (lambda *args, **kwargs: None)
+        # One pooled keep-alive connection for every agent call
+        self.session = requests.Session()
         self.check_ollama()
 
+        self.warm_up = warm_up
+
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir)
+        self._embedder = None
+        self._caches: Dict[str, Optional[SemanticCache]] = {}
+
     def check_ollama(self):
-        """Ensure Ollama is available"""
+        """Ensure the Ollama server is reachable"""
+        try:
+            self.session.get(f"{OLLAMA_URL}/api/tags", timeout=5).raise_for_status()
+        except requests.RequestException:
+            print(f"Error: Ollama server is not reachable at {OLLAMA_URL}")
+            print("Start it with: ollama serve")
+            sys.exit(1)
+
+    def warm_models(self, model_names: List[str]):
+        """
+        Load a workflow's models concurrently instead of on each first call
+        Skipped unless all of them fit in free VRAM together: otherwise the
+        loads evict each other and the first call gets slower, not faster.
+        """
+        if not self.warm_up:
+            return
+
+        try:
+            loaded = {
+                m["name"] for m in
+                self.session.get(f"{OLLAMA_URL}/api/ps", timeout=5).json().get("models", [])
+            }
+            sizes = {
+                m["name"]: m["size"] for m in
+                self.session.get(f"{OLLAMA_URL}/api/tags", timeout=5).json().get("models", [])
+            }
+        except (requests.RequestException, ValueError):
+            self.log("Warm-up skipped: could not query Ollama for model sizes")
+            return
+
+        to_load = [name for name in dict.fromkeys(model_names) if name not in loaded]
+        if not to_load:
+            return
+        missing = [name for name in to_load if name not in sizes]
+        if missing:
+            self.log(f"Warm-up skipped: not installed: {', '.join(missing)}")
+            return
+
+        needed_mb = sum(sizes[name] for name in to_load) / (1024 * 1024)
+        needed_mb += self.WARM_OVERHEAD_MB * len(to_load)
+        free_mb = self.free_vram_mb()
+        if free_mb is None:
+            self.log("Warm-up skipped: free VRAM unknown (nvidia-smi not available)")
+            return
+        if needed_mb > free_mb:
+            self.log(f"Warm-up skipped: {len(to_load)} model(s) need ~{needed_mb / 1024:.1f}GB, "
+                     f"only {free_mb / 1024:.1f}GB VRAM free")
+            return
+
+        for name in to_load:
+            threading.Thread(target=self._warm, args=(name,), daemon=True).start()
+
+    @staticmethod
+    def free_vram_mb() -> Optional[float]:
+        """Free memory summed over all GPUs, or None if it can't be read"""
         try:
-            subprocess.run(
-                ["ollama", "--version"],
+            result = subprocess.run(
+                ['nvidia-smi', '--query-gpu=memory.free', '--format=csv,noheader,nounits'],
                 capture_output=True,
+                text=True,
                 check=True
             )
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            print("Error: Ollama is not installed")
-            sys.exit(1)
+            return float(sum(int(line) for line in result.stdout.split()))
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            return None
 
-    def log(self, message: str):
-        """Log message if verbose"""
-        if self.verbose:
-            print(message)
+    def _warm(self, model_name: str):
+        """Ask Ollama to load a model and keep it resident"""
+        try:
+            self.session.post(
+                f"{OLLAMA_URL}/api/generate",
+                json={
+                    "model": model_name,
+                    "prompt": "",
+                    "stream": False,
+                    "keep_alive": self.KEEP_ALIVE,
+                    "options": {"num_predict": 1}
+                },
+                timeout=600
+            )
+        except requests.RequestException:
+            pass  # The real call will report the problem
+
+    def get_cache(self, name: str) -> Optional[SemanticCache]:
+        """Open a semantic cache on first use (None if caching is unavailable)"""
+        if not self.use_cache:
+            return None
+        if name not in self._caches:
+            try:
+                if self._embedder is None:
+                    from langchain_community.embeddings import HuggingFaceEmbeddings
+                    self._embedder = HuggingFaceEmbeddings(
+                        model_name="sentence-transformers/all-MiniLM-L6-v2"
+                    )
+                self._caches[name] = SemanticCache(self._embedder, self.cache_dir, name)
+            except ImportError:
+                self.log("Semantic cache disabled (install langchain-community, "
+                         "sentence-transformers and faiss-cpu to enable it)")
+                self.use_cache = False
+                return None
+            except Exception as e:
+                # e.g. OSError offline with no cached MiniLM, or a corrupt cache file
+                self.log(f"Semantic cache disabled: {e}")
+                self.use_cache = False
+                return None
+        return self._caches[name]
+
+    def cached_call(
+        self,
+        cache_name: str,
+        key: str,
+        model_name: str,
+        prompt: str,
+        temperature: float = 0.15,
+        system_prompt: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """call_model, reusing the output of a semantically similar earlier key"""
+        cache = self.get_cache(cache_name)
+        if cache is not None:
+            hit = cache.lookup(key, model_name)
+            if hit is not None:
+                output, similarity = hit
+                if self.verbose:
+                    self.log(f"{cache_name} cache hit similarity={similarity:.2f}")
+                if on_token:
+                    on_token(output)
+                return output
+
+        output = self.call_model(model_name, prompt, temperature, system_prompt, on_token)
+
+        # Don't cache failed calls
+        if cache is not None and not output.startswith("Error:"):
+            cache.store(key, model_name, output)
+        return output
+
+    def print_token(self, token: str):
+        """Stream a token to stdout as it arrives"""
+        print(token, end="", flush=True)
 
     def call_model(
         self,
         model_name: str,
         prompt: str,
         temperature: float = 0.15,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> str:
-        """Call an Ollama model with the given prompt"""
+        """Call an Ollama model, passing each streamed token to on_token"""
+        return self.generate(model_name, prompt, temperature, system_prompt, on_token)[0]
 
-        full_prompt = prompt
+    def generate(
+        self,
+        model_name: str,
+        prompt: str,
+        temperature: float = 0.15,
+        system_prompt: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        context: Optional[List[int]] = None
+    ) -> Tuple[str, Optional[List[int]]]:
+        """
+        Call an Ollama model and also return its context (token ids)
+        Passing that context to a later call on the same model continues
+        the conversation without re-prefilling it.
+        """
+        payload = {
+            "model": model_name,
+            "prompt": prompt,
+            "options": {"temperature": temperature},
+            "stream": True,
+            "keep_alive": self.KEEP_ALIVE
+        }
+        # Sent separately so the server can reuse the tokenized system prompt
         if system_prompt:
-            full_prompt = f"{system_prompt}\n\n{prompt}"
+            payload["system"] = system_prompt
+        if context:
+            payload["context"] = context
 
         try:
-            result = subprocess.run(
-                ["ollama", "run", model_name, full_prompt],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=120
-            )
-            return result.stdout.strip()
-        except subprocess.TimeoutExpired:
-            return "Error: Model call timed out"
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e}"
+            with self.session.post(
+                f"{OLLAMA_URL}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=600
+            ) as resp:
+                resp.raise_for_status()
+                tokens = []
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        return f"Error: {chunk['error']}", None
+                    token = chunk.get("response", "")
+                    if token:
+                        tokens.append(token)
+                        if on_token:
+                            on_token(token)
+                    if chunk.get("done"):
+                        context = chunk.get("context")
+                        break
+            return "".join(tokens).strip(), context
+        except requests.Timeout:
+            return "Error: Model call timed out", None
+        except requests.RequestException as e:
+            return f"Error: {e}", None
 
     def planning_agent(self, task_description: str) -> Dict[str, any]:
         """
@@ -117,19 +412,11 @@ class MultiAgentOrchestrator:
         self.log("PLANNING AGENT - Analyzing Task")
         self.log("=" * 60)
 
-        system_prompt = """You are an expert software architect. Your role is to:
-1. Analyze the task requirements thoroughly
-2. Break down the task into clear, actionable steps
-3. Identify potential challenges and edge cases
-4. Suggest the best approach and design patterns
-5. Create a detailed implementation plan
-
-Provide a structured plan with:
-- Overview of the approach
-- Step-by-step implementation steps
-- Key considerations and potential issues
-- Suggestions for testing
-"""
+        system_prompt = (
+            "You are an expert software architect. Analyze the task, then give a "
+            "structured plan: approach overview, numbered implementation steps, "
+            "edge cases and risks, and what to test."
+        )
 
         prompt = f"""Task: {task_description}
 
@@ -137,20 +424,22 @@ Please create a detailed implementation plan for this task.
 """
 
         model = self.MODELS[AgentRole.PLANNING]
-        self.log(f"Using model: {model.name}")
-        self.log(f"Temperature: {model.temperature}\n")
+        if self.verbose:
+            self.log(f"Using model: {model.name}")
+            self.log(f"Temperature: {model.temperature}\n")
 
-        plan = self.call_model(
+        self.log("Plan:")
+        self.log("-" * 60)
+        plan = self.cached_call(
+            "plan_cache",
+            task_description,
             model.name,
             prompt,
             model.temperature,
-            system_prompt
+            system_prompt,
+            self.print_token if self.verbose else None
         )
-
-        self.log("Plan created:")
-        self.log("-" * 60)
-        self.log(plan)
-        self.log("-" * 60)
+        self.log("\n" + "-" * 60)
 
         return {
             "plan": plan,
@@ -167,16 +456,11 @@ Please create a detailed implementation plan for this task.
         self.log("CODING AGENT - Implementing Solution")
         self.log("=" * 60)
 
-        system_prompt = """You are an expert software engineer. Your role is to:
-1. Implement code based on the provided plan
-2. Write clean, efficient, and well-documented code
-3. Follow best practices and coding standards
-4. Include proper error handling
-5. Add comments for complex logic
-6. Ensure code is production-ready
-
-Focus on code quality over speed. The code should be correct, maintainable, and robust.
-"""
+        system_prompt = (
+            "You are an expert software engineer. Implement the given plan as "
+            "complete, correct, production-ready code with error handling and "
+            "comments on complex logic. Prefer quality over speed."
+        )
 
         prompt = f"""Task: {task}
 
@@ -187,20 +471,20 @@ Please implement the code according to this plan. Provide complete, working code
 """
 
         model = self.MODELS[AgentRole.CODING]
-        self.log(f"Using model: {model.name}")
-        self.log(f"Temperature: {model.temperature}\n")
+        if self.verbose:
+            self.log(f"Using model: {model.name}")
+            self.log(f"Temperature: {model.temperature}\n")
 
+        self.log("Code:")
+        self.log("-" * 60)
         code = self.call_model(
             model.name,
             prompt,
             model.temperature,
-            system_prompt
+            system_prompt,
+            self.print_token if self.verbose else None
         )
-
-        self.log("Code generated:")
-        self.log("-" * 60)
-        self.log(code)
-        self.log("-" * 60)
+        self.log("\n" + "-" * 60)
 
         return {
             "code": code,
@@ -217,39 +501,68 @@ Please implement the code according to this plan. Provide complete, working code
         self.log("TESTING AGENT - Validating Solution")
         self.log("=" * 60)
 
-        system_prompt = """You are an expert QA engineer. Your role is to:
-1. Review the provided code thoroughly
-2. Identify potential bugs or issues
-3. Generate comprehensive unit tests
-4. Test edge cases and error conditions
-5. Provide feedback on code quality
-6. Suggest improvements if needed
-
-Focus on thorough validation and quality assurance.
-"""
+        system_prompt = (
+            "You are an expert QA engineer. Review code for bugs and quality "
+            "issues, write thorough unit tests covering edge cases and error "
+            "conditions, and suggest concrete improvements."
+        )
 
-        prompt = f"""Task: {task}
+        shared = f"""Task: {task}
 
 Code to test:
 {code}
-
-Please:
-1. Review the code for potential issues
-2. Generate comprehensive unit tests
-3. Identify any bugs or improvements needed
 """
 
+        instructions = {
+            "review": "Review the code for potential issues and code quality.",
+            "tests": "Generate comprehensive unit tests, including edge cases "
+                     "and error conditions.",
+            "bugs": "Identify any bugs or improvements needed.",
+        }
+
         model = self.MODELS[AgentRole.TESTING]
-        self.log(f"Using model: {model.name}")
-        self.log(f"Temperature: {model.temperature}\n")
+        if self.verbose:
+            self.log(f"Using model: {model.name}")
+            self.log(f"Temperature: {model.temperature}\n")
 
-        tests = self.call_model(
+        # The review prefills task + code once; the other sub-tasks continue
+        # from its context instead of re-processing that long prefix
+        outputs = {}
+        outputs["review"], review_context = self.generate(
             model.name,
-            prompt,
+            f"{shared}\n{instructions['review']}",
             model.temperature,
             system_prompt
         )
 
+        follow_ups = {}
+        for name in ("tests", "bugs"):
+            if review_context:
+                follow_ups[name] = (instructions[name], None, review_context)
+            else:
+                follow_ups[name] = (f"{shared}\n{instructions[name]}", system_prompt, None)
+
+        # Independent follow-ups; they run concurrently when the server allows
+        # parallel requests (OLLAMA_NUM_PARALLEL >= 2)
+        # Not streamed: concurrent outputs would interleave on stdout
+        with ThreadPoolExecutor(max_workers=len(follow_ups)) as executor:
+            futures = {
+                name: executor.submit(
+                    self.generate,
+                    model.name,
+                    prompt,
+                    model.temperature,
+                    system,
+                    context=context
+                )
+                for name, (prompt, system, context) in follow_ups.items()
+            }
+            outputs.update({name: future.result()[0] for name, future in futures.items()})
+
+        tests = "\n\n".join(
+            f"## {name.capitalize()}\n{output}" for name, output in outputs.items()
+        )
+
         self.log("Tests and feedback:")
         self.log("-" * 60)
         self.log(tests)
@@ -257,6 +570,8 @@ Please:
 
         return {
             "tests": tests,
+            "review": outputs["review"],
+            "bugs": outputs["bugs"],
             "model": model.name,
             "timestamp": time.time()
         }
@@ -272,6 +587,7 @@ Please:
         print("=" * 70)
 
         start_time = time.time()
+        self.warm_models([model.name for model in self.MODELS.values()])
 
         # Step 1: Planning
         planning_result = self.planning_agent(task)
@@ -305,53 +621,66 @@ Please:
     def run_iterative_refinement(self, task: str) -> Dict[str, any]:
         """
         Iterative refinement workflow
-        Draft (Q4) -> Refine (Q6) -> Deep fix if needed (Q8)
+        Draft (T=0.3) -> Refine (T=0.15) -> Deep fix (T=0.1), all on 7B Q6
         """
         print("\n" + "=" * 70)
         print("ITERATIVE REFINEMENT WORKFLOW")
         print("Expected: 23.79% improvement over one-shot generation")
         print("=" * 70)
 
+        self.log(f"Strategy: all passes on {self.ITERATIVE_MODEL}, "
+                 f"varying prompt and temperature (no model reloads)")
+        self.warm_models([self.ITERATIVE_MODEL])
+
         results = {"task": task, "iterations": []}
+        on_token = self.print_token if self.verbose else None
 
         # Pass 1: Fast draft
-        self.log("\nPass 1: Fast Draft (Q4)")
-        draft = self.call_model(
-            "qwen2.5-coder:7b-instruct-q4_K_M",
+        self.log("\nPass 1: Fast Draft")
+        draft = self.cached_call(
+            "draft_cache",
+            task,
+            self.ITERATIVE_MODEL,
             f"Task: {task}\n\nCreate a working implementation:",
-            0.2
+            0.3,
+            on_token=on_token
         )
+        self.log("")
         results["iterations"].append({
             "pass": 1,
-            "model": "7b-q4",
+            "model": "7b-q6",
             "output": draft
         })
 
         # Pass 2: Quality refinement
-        self.log("\nPass 2: Quality Refinement (Q6)")
+        self.log("\nPass 2: Quality Refinement")
         refined = self.call_model(
-            "qwen2.5-coder:7b-instruct-q6_K",
+            self.ITERATIVE_MODEL,
             f"Task: {task}\n\nInitial draft:\n{draft}\n\n"
             f"Review and improve this code, fix any issues:",
-            0.15
+            0.15,
+            on_token=on_token
         )
+        self.log("")
         results["iterations"].append({
             "pass": 2,
             "model": "7b-q6",
             "output": refined
         })
 
-        # Pass 3: Deep fix if needed (Q8)
-        self.log("\nPass 3: Deep Fix (Q8)")
+        # Pass 3: Deep fix if needed
+        self.log("\nPass 3: Deep Fix")
         final = self.call_model(
-            "qwen2.5-coder:7b-instruct-q8_0",
+            self.ITERATIVE_MODEL,
             f"Task: {task}\n\nRefined code:\n{refined}\n\n"
             f"Final review and any necessary fixes:",
-            0.15
+            0.1,
+            on_token=on_token
         )
+        self.log("")
         results["iterations"].append({
             "pass": 3,
-            "model": "7b-q8",
+            "model": "7b-q6",
             "output": final
         })
 
@@ -361,35 +690,42 @@ Please:
 def main():
     if len(sys.argv) < 2:
         print("Multi-Agent Orchestration System")
-        print("\nUsage: python multi_agent.py <workflow> <task>")
+        print("\nUsage: python multi_agent.py <workflow> <task> [--no-cache] [--warm]")
         print("\nWorkflows:")
         print("  three-agent  - Three-agent quality workflow (40-60% bug reduction)")
         print("  iterative    - Iterative refinement workflow (23.79% improvement)")
         print("\nExamples:")
         print('  python multi_agent.py three-agent "Create a binary search tree"')
         print('  python multi_agent.py iterative "Implement quicksort algorithm"')
+        print("\nOptions:")
+        print("  --no-cache   Don't reuse plans/drafts from similar earlier tasks")
+        print("  --warm       Preload a workflow's models together if they fit in free VRAM")
         sys.exit(0)
 
-    workflow = sys.argv[1]
-    task = " ".join(sys.argv[2:]) if len(sys.argv) > 2 else "Create a simple calculator"
+    args = [a for a in sys.argv[1:] if a not in ("--no-cache", "--warm")]
+    use_cache = "--no-cache" not in sys.argv
+    warm_up = "--warm" in sys.argv
 
-    orchestrator = MultiAgentOrchestrator(verbose=True)
+    workflow = args[0]
+    task = " ".join(args[1:]) if len(args) > 1 else "Create a simple calculator"
+
+    orchestrator = MultiAgentOrchestrator(
+        verbose=True, use_cache=use_cache, warm_up=warm_up
+    )
 
     if workflow == "three-agent":
         results = orchestrator.run_three_agent_workflow(task)
 
         # Save results
         output_file = "multi_agent_results.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
+        save_results(results, output_file)
         print(f"\nFull results saved to: {output_file}")
 
     elif workflow == "iterative":
         results = orchestrator.run_iterative_refinement(task)
 
         output_file = "iterative_results.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
+        save_results(results, output_file)
         print(f"\nFull results saved to: {output_file}")
 
     else:
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+FAISS Index Rebuilder
+Converts an index written by setup_rag.py (HNSW, or IVF-PQ for 1M+ chunks)
+into another index type
+
+Index types:
+- hnsw:  HNSW graph, O(log n) search instead of a full O(n) scan (default)
+- fp16:  Scalar-quantized float16 vectors, half the memory of float32
+- ivfpq: Inverted lists + product quantization, ~32x smaller for large corpora
+
+The docstore and id mapping are kept as-is, so the rebuilt index loads
+with the same FAISS.load_local call.
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from index_builders import BUILDERS
+except ImportError:
+    print("Please install required packages:")
+    print("  pip install numpy langchain langchain-community sentence-transformers faiss-cpu")
+    sys.exit(1)
+
+
+def rebuild_index(
+    index_path: str,
+    output_path: Optional[str] = None,
+    index_type: str = "hnsw"
+):
+    """Load a saved vectorstore, rebuild its index and save it"""
+    index_path = Path(index_path)
+    output_path = Path(output_path) if output_path else index_path
+
+    print(f"Loading index from: {index_path}")
+    embeddings = HuggingFaceEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2"
+    )
+    vectorstore = FAISS.load_local(
+        str(index_path),
+        embeddings,
+        allow_dangerous_deserialization=True
+    )
+
+    old_index = vectorstore.index
+    print(f"Vectors: {old_index.ntotal} x {old_index.d} dims")
+
+    start_time = time.time()
+    xb = old_index.reconstruct_n(0, old_index.ntotal)
+
+    # Keep the source metric so LangChain's scores mean the same thing
+    vectorstore.index = BUILDERS[index_type](xb, old_index.metric_type)
+    elapsed = time.time() - start_time
+    print(f"{index_type} index built in {elapsed:.1f} seconds")
+
+    vectorstore.save_local(str(output_path))
+    print(f"✓ Index saved to: {output_path}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = dict(
+        a[2:].split("=", 1) for a in sys.argv[1:]
+        if a.startswith("--") and "=" in a
+    )
+
+    if not args:
+        print("FAISS Index Rebuilder")
+        print("\nUsage: python rebuild_index.py <index_path> [output_path] "
+              "[--type=hnsw|fp16|ivfpq]")
+        print("\nExamples:")
+        print("  python rebuild_index.py ./rag_system/codebase_index")
+        print("  python rebuild_index.py ./rag_system/codebase_index --type=fp16")
+        sys.exit(0)
+
+    index_path = args[0]
+    output_path = args[1] if len(args) > 1 else None
+    index_type = flags.get("type", "hnsw")
+
+    if not Path(index_path).exists():
+        print(f"Error: Index does not exist: {index_path}")
+        sys.exit(1)
+
+    if index_type not in BUILDERS:
+        print(f"Unknown index type: {index_type}")
+        print(f"Available types: {', '.join(BUILDERS)}")
+        sys.exit(1)
+
+    try:
+        rebuild_index(index_path, output_path, index_type)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,13 @@ import os
 import sys
 import json
 import time
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import hashlib
+import importlib.util
 
 
 def check_dependencies():
@@ -26,16 +30,14 @@ def check_dependencies():
         'langchain': 'langchain',
         'langchain_community': 'langchain-community',
         'sentence_transformers': 'sentence-transformers',
-        'faiss': 'faiss-cpu',
-        'chromadb': 'chromadb'
+        'faiss': 'faiss-cpu'
     }
 
-    missing = []
-    for module, package in required.items():
-        try:
-            __import__(module)
-        except ImportError:
-            missing.append(package)
+    # find_spec locates packages without paying for their import
+    missing = [
+        package for module, package in required.items()
+        if importlib.util.find_spec(module) is None
+    ]
 
     if missing:
         print("Missing required packages:")
@@ -45,12 +47,98 @@ def check_dependencies():
         sys.exit(1)
 
 
-check_dependencies()
+if __name__ == "__main__":
+    check_dependencies()
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+import numpy as np
+
+
+def content_digests(texts: List[str], seed: bytes = b"") -> List[bytes]:
+    """16-byte blake2b digests of texts, each prefixed by seed"""
+    # Copying a primed hasher is cheaper than building one per text
+    base = hashlib.blake2b(seed, digest_size=16)
+    encode = str.encode
+    digests = []
+    for text in texts:
+        h = base.copy()
+        h.update(encode(text, 'utf-8', 'surrogatepass'))
+        digests.append(h.digest())
+    return digests
+
+
+class OnnxInt8Embeddings(Embeddings):
+    """all-MiniLM-L6-v2 run as a dynamically int8-quantized ONNX model
+
+    The model is exported and quantized once, then cached in output_dir.
+    Needs: pip install optimum[onnxruntime] onnxruntime
+    """
+
+    MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+    MAX_LENGTH = 256  # sentence-transformers' max_seq_length for MiniLM
+
+    def __init__(self, output_dir: Path, batch_size: int = 256):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.batch_size = batch_size
+
+        model_path = output_dir / "minilm-int8.onnx"
+        tokenizer_dir = output_dir / "minilm-tokenizer"
+        if not model_path.exists():
+            self.export_quantized(model_path, tokenizer_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(tokenizer_dir))
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    @classmethod
+    def export_quantized(cls, model_path: Path, tokenizer_dir: Path):
+        """Export MiniLM to ONNX and quantize its MatMul weights to int8"""
+        import tempfile
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoTokenizer
+
+        print("Exporting embedding model to ONNX int8 (one-time)...")
+        with tempfile.TemporaryDirectory() as export_dir:
+            model = ORTModelForFeatureExtraction.from_pretrained(cls.MODEL_NAME, export=True)
+            model.save_pretrained(export_dir)
+            quantize_dynamic(
+                str(Path(export_dir) / "model.onnx"),
+                str(model_path),
+                weight_type=QuantType.QInt8
+            )
+        AutoTokenizer.from_pretrained(cls.MODEL_NAME).save_pretrained(str(tokenizer_dir))
+        print(f"Quantized model saved to: {model_path}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.MAX_LENGTH,
+                return_tensors="np"
+            )
+            feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            # Mean pooling over real tokens, then L2-normalize (as in training)
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
 
 
 class CodebaseRAG:
@@ -71,23 +159,48 @@ class CodebaseRAG:
         'coverage', '.next', '.cache', 'tmp', 'temp'
     }
 
-    def __init__(self, codebase_path: str, output_dir: str = "./rag_system"):
+    # Minified/generated files (*.min.*, *-lock.json, *bundle*.js)
+    GENERATED_FILE_RE = re.compile(r'\.min\.|-lock\.json$|bundle.*\.js$')
+    MAX_MEAN_LINE_LENGTH = 400
+    MAX_FIRST_LINE_LENGTH = 2000
+
+    # Threads reading files while the main thread splits them into chunks
+    LOAD_WORKERS = 16
+
+    # HNSW below this many chunks, IVF-PQ (~48 bytes/vector) at or above it
+    IVFPQ_MIN_VECTORS = 1_000_000
+
+    def __init__(
+        self,
+        codebase_path: str,
+        output_dir: str = "./rag_system",
+        onnx_int8: bool = False
+    ):
         self.codebase_path = Path(codebase_path).resolve()
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
 
         self.index_path = self.output_dir / "codebase_index"
         self.metadata_path = self.output_dir / "metadata.json"
+        self.cache_path = self.output_dir / "emb_cache.sqlite"
 
         print(f"Initializing RAG system for: {self.codebase_path}")
 
-        # Initialize embeddings model
-        print("Loading embedding model (all-MiniLM-L6-v2)...")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        # Initialize embeddings model (large batches keep the encoder saturated)
+        device = self.detect_device()
+        batch_size = 512 if device == 'cuda' else 256
+        # Cache keys include the backend so int8 and FP32 vectors never mix
+        self.embedding_tag = "minilm-int8" if onnx_int8 else "minilm"
+        if onnx_int8:
+            print("Loading embedding model (all-MiniLM-L6-v2, ONNX int8)...")
+            self.embeddings = OnnxInt8Embeddings(self.output_dir, batch_size)
+        else:
+            print(f"Loading embedding model (all-MiniLM-L6-v2) on {device}...")
+            self.embeddings = HuggingFaceEmbeddings(
+                model_name="sentence-transformers/all-MiniLM-L6-v2",
+                model_kwargs={'device': device},
+                encode_kwargs={'normalize_embeddings': True, 'batch_size': batch_size}
+            )
 
         # Initialize text splitter with code-aware separators
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -108,91 +221,210 @@ class CodebaseRAG:
             length_function=len,
         )
 
-    def should_skip_file(self, file_path: Path) -> bool:
-        """Check if file should be skipped"""
-        # Skip if in excluded directory
-        for skip_dir in self.SKIP_DIRS:
-            if skip_dir in file_path.parts:
-                return True
-
-        # Skip if not a code file
-        if file_path.suffix not in self.CODE_EXTENSIONS:
-            return True
-
-        # Skip large files (>1MB)
+    @staticmethod
+    def detect_device() -> str:
+        """Use the GPU for embeddings when PyTorch can see one"""
         try:
-            if file_path.stat().st_size > 1_000_000:
-                return True
-        except:
-            return True
-
-        return False
+            import torch
+            return 'cuda' if torch.cuda.is_available() else 'cpu'
+        except ImportError:
+            return 'cpu'
+
+    def _walk(self, root: Path):
+        """Yield code files under root, pruning SKIP_DIRS before descending"""
+        stack = [str(root)]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.SKIP_DIRS:
+                                stack.append(entry.path)
+                        elif entry.is_file():
+                            # Same as Path.suffix: dotfiles and bare names have none
+                            stem, _, ext = entry.name.rpartition('.')
+                            if not stem or '.' + ext not in self.CODE_EXTENSIONS:
+                                continue
+                            if self.GENERATED_FILE_RE.search(entry.name):
+                                continue
+                            # Skip large files (>1MB)
+                            if entry.stat().st_size <= 1_000_000:
+                                yield Path(entry.path)
+                    except OSError:
+                        continue
 
     def collect_files(self) -> List[Path]:
         """Collect all code files from codebase"""
         print("Scanning codebase for code files...")
 
-        files = []
-        for file_path in self.codebase_path.rglob('*'):
-            if file_path.is_file() and not self.should_skip_file(file_path):
-                files.append(file_path)
+        files = list(self._walk(self.codebase_path))
 
         print(f"Found {len(files)} code files")
         return files
 
+    def looks_minified(self, data: bytes) -> bool:
+        """Detect minified/generated code from line lengths in its first 8KB"""
+        head = data[:8192]
+        newlines = head.count(b'\n')
+        if newlines and len(head) / newlines > self.MAX_MEAN_LINE_LENGTH:
+            return True
+
+        first_line = head.find(b'\n')
+        if first_line == -1:
+            first_line = len(head)
+        return first_line > self.MAX_FIRST_LINE_LENGTH
+
     def load_file(self, file_path: Path) -> Optional[str]:
-        """Load file content"""
+        """Load file content (None for unreadable or binary files)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            # Bytes + one decode skips text mode's incremental newline handling
+            data = file_path.read_bytes()
+            if b'\0' in data[:4096] or self.looks_minified(data):
+                return None
+            return data.decode('utf-8', errors='replace')
         except Exception as e:
             print(f"Warning: Could not read {file_path}: {e}")
             return None
 
-    def create_documents(self, files: List[Path]) -> List[Document]:
-        """Create Document objects from files"""
+    def create_chunks(self, files: List[Path]) -> Tuple[List[str], List[Dict]]:
+        """Split files into chunk texts with a parallel list of metadata"""
         print("Creating document chunks...")
 
-        documents = []
-        for i, file_path in enumerate(files):
-            if (i + 1) % 100 == 0:
-                print(f"Processing file {i + 1}/{len(files)}...")
-
-            content = self.load_file(file_path)
-            if not content:
-                continue
-
-            # Get relative path for metadata
-            rel_path = file_path.relative_to(self.codebase_path)
-
-            # Split content into chunks
-            chunks = self.text_splitter.split_text(content)
-
-            # Create documents with metadata
-            for chunk_idx, chunk in enumerate(chunks):
-                doc = Document(
-                    page_content=chunk,
-                    metadata={
-                        "source": str(rel_path),
-                        "file_type": file_path.suffix,
+        # Plain lists; Documents are only built for the chunks that get indexed
+        texts: List[str] = []
+        metadatas: List[Dict] = []
+        with ThreadPoolExecutor(max_workers=self.LOAD_WORKERS) as executor:
+            # map() yields in order, so reads overlap with splitting below
+            contents = executor.map(self.load_file, files)
+
+            for i, (file_path, content) in enumerate(zip(files, contents)):
+                if (i + 1) % 100 == 0:
+                    print(f"Processing file {i + 1}/{len(files)}...")
+
+                if not content:
+                    continue
+
+                # Per-file values shared by all of its chunks
+                source = str(file_path.relative_to(self.codebase_path))
+                file_type = file_path.suffix
+
+                # Split content into chunks
+                chunks = self.text_splitter.split_text(content)
+                total_chunks = len(chunks)
+
+                texts.extend(chunks)
+                metadatas.extend(
+                    {
+                        "source": source,
+                        "file_type": file_type,
                         "chunk_index": chunk_idx,
-                        "total_chunks": len(chunks)
+                        "total_chunks": total_chunks
                     }
+                    for chunk_idx in range(total_chunks)
                 )
-                documents.append(doc)
 
-        print(f"Created {len(documents)} document chunks")
-        return documents
+        print(f"Created {len(texts)} document chunks")
+        return texts, metadatas
+
+    def embed_with_cache(self, texts: List[str]) -> "np.ndarray":
+        """Embed chunks, reusing vectors of unchanged content from earlier runs
 
-    def build_index(self, documents: List[Document]):
+        Returns a (len(texts), dim) float32 array.
+        """
+        conn = sqlite3.connect(str(self.cache_path))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(hash BLOB PRIMARY KEY, vec BLOB)"
+        )
+
+        keys = content_digests(texts, self.embedding_tag.encode('utf-8') + b"\0")
+
+        # SQLite caps bound parameters, so look keys up in batches
+        cached = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), 500):
+            batch = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            cached.update(conn.execute(
+                f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})",
+                batch
+            ))
+
+        misses = [i for i, key in enumerate(keys) if key not in cached]
+        print(f"Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+
+        if misses:
+            new_vecs = np.asarray(
+                self.embeddings.embed_documents([texts[i] for i in misses]),
+                dtype=np.float32
+            )
+            rows = []
+            for i, vec in zip(misses, new_vecs):
+                blob = vec.tobytes()
+                cached[keys[i]] = blob
+                rows.append((keys[i], blob))
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)", rows
+            )
+            conn.commit()
+        conn.close()
+
+        # One contiguous buffer; per-vector Python lists would be ~10x larger
+        return np.frombuffer(
+            b"".join(cached[key] for key in keys), dtype=np.float32
+        ).reshape(len(keys), -1)
+
+    def build_index(self, texts: List[str], metadatas: List[Dict]):
         """Build FAISS vector index"""
+        # FAISS is only needed once there is something to index
+        import faiss
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from index_builders import build_hnsw, build_ivfpq
+
         print("Building vector index...")
         print("This may take several minutes for large codebases...")
 
         start_time = time.time()
 
-        # Create FAISS index
-        vectorstore = FAISS.from_documents(documents, self.embeddings)
+        # Identical chunks (license headers, boilerplate) are embedded and
+        # indexed once; the kept copy lists the other files it appears in
+        unique: Dict[bytes, int] = {}
+        for i, key in enumerate(content_digests(texts)):
+            kept = unique.setdefault(key, i)
+            if kept != i:
+                metadatas[kept].setdefault("duplicates", []).append(metadatas[i]["source"])
+        print(f"Unique chunks: {len(unique)} of {len(texts)}")
+
+        num_chunks = len(texts)
+        num_files = len(set(meta["source"] for meta in metadatas))
+        texts = [texts[i] for i in unique.values()]
+        metadatas = [metadatas[i] for i in unique.values()]
+        xb = self.embed_with_cache(texts)
+
+        # Create FAISS index (L2 like LangChain's default, so scores match)
+        if len(xb) >= self.IVFPQ_MIN_VECTORS:
+            index_type = "ivfpq"
+            index = build_ivfpq(xb, faiss.METRIC_L2)
+        else:
+            index_type = "hnsw"
+            index = build_hnsw(xb, faiss.METRIC_L2)
+        print(f"Index type: {index_type}")
+
+        ids = [str(i) for i in range(len(texts))]
+        vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({
+                doc_id: Document(page_content=text, metadata=meta)
+                for doc_id, text, meta in zip(ids, texts, metadatas)
+            }),
+            index_to_docstore_id=dict(enumerate(ids))
+        )
 
         # Save index
         vectorstore.save_local(str(self.index_path))
@@ -203,8 +435,10 @@ class CodebaseRAG:
         # Save metadata
         metadata = {
             "codebase_path": str(self.codebase_path),
-            "num_documents": len(documents),
-            "num_files": len(set(doc.metadata["source"] for doc in documents)),
+            "num_documents": num_chunks,
+            "num_unique_chunks": len(unique),
+            "num_files": num_files,
+            "index_type": index_type,
             "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
             "build_time_seconds": elapsed
         }
@@ -241,14 +475,14 @@ class CodebaseRAG:
             print("No code files found!")
             return
 
-        # Create documents
-        documents = self.create_documents(files)
-        if not documents:
+        # Create chunks
+        texts, metadatas = self.create_chunks(files)
+        if not texts:
             print("No documents created!")
             return
 
         # Build index
-        vectorstore = self.build_index(documents)
+        vectorstore = self.build_index(texts, metadatas)
 
         # Test search
         self.test_search(vectorstore)
@@ -260,11 +494,10 @@ class CodebaseRAG:
         print(f"\nIndex saved to: {self.index_path}")
         print(f"Metadata saved to: {self.metadata_path}")
         print(f"\nIndexed files: {len(files)}")
-        print(f"Document chunks: {len(documents)}")
+        print(f"Document chunks: {len(texts)}")
 
-        # Estimate memory usage
-        # Rough estimate: 384 dimensions * 4 bytes * num_documents
-        memory_mb = (len(documents) * 384 * 4) / (1024 * 1024)
+        # The index is loaded whole, so its file size is its memory footprint
+        memory_mb = (self.index_path / "index.faiss").stat().st_size / (1024 * 1024)
         print(f"Estimated memory usage: {memory_mb:.1f} MB")
 
         print("\nIntegration instructions:")
@@ -280,12 +513,16 @@ class CodebaseRAG:
 
 
 def main():
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if a != "--onnx-int8"]
+    onnx_int8 = "--onnx-int8" in sys.argv
+
+    if not args:
         print("RAG System Setup")
-        print("\nUsage: python setup_rag.py <codebase_path> [output_dir]")
+        print("\nUsage: python setup_rag.py <codebase_path> [output_dir] [--onnx-int8]")
         print("\nExample:")
         print("  python setup_rag.py /path/to/your/codebase")
         print("  python setup_rag.py /path/to/your/codebase ./custom_rag_dir")
+        print("  python setup_rag.py /path/to/your/codebase --onnx-int8  # faster CPU embedding")
         print("\nThis will:")
         print("  - Scan your codebase for code files")
         print("  - Create embeddings using all-MiniLM-L6-v2")
@@ -293,14 +530,22 @@ def main():
         print("  - Enable semantic search for code context")
         sys.exit(0)
 
-    codebase_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "./rag_system"
+    codebase_path = args[0]
+    output_dir = args[1] if len(args) > 1 else "./rag_system"
 
     if not os.path.exists(codebase_path):
         print(f"Error: Path does not exist: {codebase_path}")
         sys.exit(1)
 
-    rag = CodebaseRAG(codebase_path, output_dir)
+    if onnx_int8:
+        try:
+            import onnxruntime
+            import optimum
+        except ImportError:
+            print("--onnx-int8 needs: pip install optimum[onnxruntime] onnxruntime")
+            sys.exit(1)
+
+    rag = CodebaseRAG(codebase_path, output_dir, onnx_int8=onnx_int8)
     rag.run()
 
 
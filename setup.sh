@@ -105,9 +105,12 @@ pip install langchain langchain-community
 pip install chromadb
 pip install sentence-transformers
 pip install faiss-cpu
+pip install datasketch  # Optional: near-duplicate query cache for RAG
 pip install openai  # For OpenAI-compatible API client
 pip install numpy pandas
-pip install psutil gputil  # For monitoring
+pip install requests  # For the Ollama HTTP API
+pip install orjson  # Optional: faster JSON writing of agent results
+pip install psutil gputil nvidia-ml-py  # For monitoring
 echo ""
 
 # Step 4: Create directory structure